@@ -1,7 +1,18 @@
 # config.py
 
+from micropython import const
+
 # Pin for the onboard status LED (if available)
-STATUS_LED_PIN = 2
+STATUS_LED_PIN = const(2)
+
+# --- GPIO Assignments ---
+# Defined with const() so MicroPython inlines them into the SENSORS dict.
+_PIN_DHT11 = const(4)
+_PIN_DS18B20 = const(5)
+_PIN_BUTTON_1 = const(21)
+_PIN_LDR_1 = const(34)
+_PIN_GY521_SCL = const(19)
+_PIN_GY521_SDA = const(18)
 
 # --- Sensor Configuration ---
 # This dictionary defines all the sensors connected to the ESP32.
@@ -10,7 +21,7 @@ STATUS_LED_PIN = 2
 # The following properties are supported:
 # - 'type': The type of the sensor (e.g., 'DHT11', 'DS18B20', 'Button', 'LDR', 'GY521').
 # - 'active': Set to True to enable the sensor, False to disable it.
-# - 'pin': The GPIO number the sensor is connected to.
+# - 'pin': The GPIO number the sensor is connected to (see GPIO Assignments).
 # - 'scl_pin', 'sda_pin': For I2C sensors like the GY521.
 # - 'location': A string describing the sensor's location (e.g., 'Living Room').
 # - 'provides': A dictionary describing the values the sensor provides.
@@ -23,7 +34,7 @@ SENSORS = {
     "dht11_living_room": {
         "type": "DHT11",
         "active": True,
-        "pin": 4,
+        "pin": _PIN_DHT11,
         "location": "Living Room",
         "provides": {
             "temperature": {"id": "Sensor_DHT11_Temp", "unit": "°C"},
@@ -33,29 +44,29 @@ SENSORS = {
     "ds18b20_bus_outside": {
         "type": "DS18B20",
         "active": True,
-        "pin": 5,
+        "pin": _PIN_DS18B20,
         "location": "Outside",
         "provides": {"temperature": {"id_prefix": "Sensor_DS18B20", "unit": "°C"}},
     },
     "button_1": {
         "type": "Button",
         "active": False,  # Disabled for now
-        "pin": 21,
+        "pin": _PIN_BUTTON_1,
         "location": "Desk",
         "provides": {"state": {"id": "Sensor_Button_1", "unit": "boolean"}},
     },
     "ldr_1": {
         "type": "LDR",
         "active": False,  # Disabled for now
-        "pin": 34,
+        "pin": _PIN_LDR_1,
         "location": "Window",
         "provides": {"light": {"id": "Sensor_LDR_1", "unit": "uv"}},
     },
     "gy521_1": {
         "type": "GY521",
         "active": False,  # Disabled for now
-        "scl_pin": 19,
-        "sda_pin": 18,
+        "scl_pin": _PIN_GY521_SCL,
+        "sda_pin": _PIN_GY521_SDA,
         "location": "Box",
         "provides": {
             "accel_x": {"id": "Sensor_GY521_AccelX", "unit": "g"},
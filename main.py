@@ -12,6 +12,7 @@ This script orchestrates the entire process:
 import time
 
 from machine import Pin
+from micropython import const
 
 import ntp
 
@@ -27,7 +28,10 @@ except ImportError:
 
 # --- Configuration ---
 # Time to wait between sensor reading cycles (in seconds)
-LOOP_INTERVAL_SEC = 60
+LOOP_INTERVAL_SEC = const(60)
+
+# Set to True to print a message after every loop iteration
+DEBUG = False
 
 
 def main():
@@ -41,15 +45,15 @@ def main():
         status_led.off()  # Start with LED off
 
     # --- Step 1: Connect to Wi-Fi ---
-    if not wifi.connect_wifi():
+    if not wifi.connect_wifi(led=status_led):
         print("Could not connect to Wi-Fi. Halting execution.")
         # Blink LED rapidly to indicate fatal error
         if status_led:
             for _ in range(20):
                 status_led.on()
-                time.sleep(0.1)
+                time.sleep_ms(100)
                 status_led.off()
-                time.sleep(0.1)
+                time.sleep_ms(100)
         return  # Stop everything
 
     # --- Step 2: Synchronize Time ---
@@ -58,7 +62,8 @@ def main():
     # --- Step 3: Initialize and Connect MQTT Client ---
     mqtt = None
     try:
-        mqtt = MQTT()
+        # Let the broker keep the connection open across idle loop intervals
+        mqtt = MQTT(keepalive=LOOP_INTERVAL_SEC * 2)
         if not mqtt.connect():
             print("Could not connect to MQTT. Halting execution.")
             # Consider a retry mechanism for more robustness
@@ -74,6 +79,9 @@ def main():
                     print("Reconnect failed. Waiting before next attempt.")
                     time.sleep(30)
                     continue  # Skip this loop iteration
+            elif not mqtt.ping():
+                # Connection was lost; reconnect on the next iteration
+                continue
 
             # Read all sensors
             sensor_readings = read_all_sensors()
@@ -81,14 +89,19 @@ def main():
             # Publish each reading
             if sensor_readings:
                 for reading in sensor_readings:
-                    mqtt.publish(reading["type"], reading["data"])
-                    time.sleep(0.1)  # Small delay between messages
+                    mqtt.publish_raw(reading["topic"], reading["payload"])
             else:
                 print("No sensor readings to publish.")
 
-            # Wait for the next cycle
-            print(f"--- Loop finished. Waiting for {LOOP_INTERVAL_SEC} seconds. ---")
-            time.sleep(LOOP_INTERVAL_SEC)
+            # Wait for the next cycle, handling broker packets in the meantime
+            if DEBUG:
+                print(
+                    f"--- Loop finished. Waiting for {LOOP_INTERVAL_SEC} seconds. ---"
+                )
+            deadline = time.ticks_add(time.ticks_ms(), LOOP_INTERVAL_SEC * 1000)
+            while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+                mqtt.check_msg()
+                time.sleep_ms(500)
 
     except KeyboardInterrupt:
         print("\nExecution stopped by user (Ctrl+C).")
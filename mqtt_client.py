@@ -31,9 +31,13 @@ class MQTT:
     Formats and sends sensor data as JSON payloads.
     """
 
-    def __init__(self):
+    def __init__(self, keepalive=0):
         """
         Initializes the MQTT client.
+
+        Args:
+            keepalive (int): Keepalive interval in seconds announced to the
+                             broker. 0 disables the keepalive.
         """
         if not MQTT_BROKER or not MQTT_PORT:
             raise ValueError(
@@ -51,6 +55,7 @@ class MQTT:
             port=self.port,
             user=self.user,
             password=self.password,
+            keepalive=keepalive,
             ssl=MQTT_USE_SSL,
         )  # Added ssl=MQTT_USE_SSL
         self.is_connected = False
@@ -80,26 +85,63 @@ class MQTT:
             self.client.disconnect()
             self.is_connected = False
 
-    def publish(self, topic_suffix, sensor_data):
+    def ping(self):
+        """
+        Sends a ping to the broker to keep the connection alive.
+        Returns True on success, False if the connection was lost.
+        """
+        if not self.is_connected:
+            return False
+        try:
+            self.client.ping()
+            return True
+        except OSError as e:
+            print(f"MQTT ping failed: {e}")
+            self.is_connected = False
+            return False
+
+    def check_msg(self):
+        """
+        Processes any pending packets from the broker (e.g. ping responses)
+        without blocking. Marks the client as disconnected on socket errors.
+        """
+        if not self.is_connected:
+            return
+        try:
+            self.client.check_msg()
+        except OSError as e:
+            print(f"MQTT connection error: {e}")
+            self.is_connected = False
+
+    def publish(self, topic, sensor_data):
         """
-        Publishes a message to a specific MQTT topic.
+        Publishes a sensor reading dictionary as a JSON payload.
 
         Args:
-            topic_suffix (str): The sensor type or specific identifier for the topic.
+            topic (bytes): The full MQTT topic, e.g. b"Sensor/DHT11".
             sensor_data (dict): A dictionary containing the sensor reading payload.
                                 Example: {"id": "Sensor_ID", "value": 25.5, ...}
         """
+        self.publish_raw(topic, ujson.dumps(sensor_data).encode("utf-8"))
+
+    def publish_raw(self, topic, payload):
+        """
+        Publishes an already formatted JSON payload to a specific MQTT topic.
+
+        Args:
+            topic (bytes): The full MQTT topic, e.g. b"Sensor/DHT11".
+            payload (bytes): The UTF-8 encoded JSON sensor reading.
+        """
         if not self.is_connected:
             print("Cannot publish, MQTT client is not connected.")
             return
 
-        topic = f"Sensor/{topic_suffix}"
-        payload = ujson.dumps(sensor_data).encode("utf-8")
-
         try:
-            print(f"Publishing to topic '{topic}': {payload}")
             self.client.publish(topic, payload)
+        except OSError as e:
+            print(f"Failed to publish message: {e}")
+            # Only drop the connection if the broker is really unreachable
+            self.ping()
         except Exception as e:
             print(f"Failed to publish message: {e}")
-            # In a real-world scenario, you might want to try reconnecting here.
             self.is_connected = False
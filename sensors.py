@@ -2,195 +2,262 @@
 This module handles the reading of all configured sensors.
 
 It contains a main function `read_all_sensors` that iterates through the
-SENSORS dictionary from `config.py`, calls the appropriate function for each
-sensor type, and returns a list of readings.
+active sensors from the SENSORS dictionary in `config.py`, calls the
+appropriate function for each sensor type, and returns a list of readings.
+The reader for each active sensor is resolved once when the module is imported.
 
 To add support for a new sensor type, you need to:
-1. Add a new `_read_<sensortype>` function.
-2. This function should handle the hardware interaction.
+1. Add a new `_read_<sensortype>(sensor_name, config)` function.
+2. This function should handle the hardware interaction. Hardware objects
+   should be created once and kept in `_HW_CACHE` under `sensor_name`.
 3. It must return a list of dictionaries, where each dictionary represents
-   a single value to be published via MQTT.
-   e.g., [{'type': 'DHT11', 'data': {'id': ..., 'value': ...}}, ...]
-4. Add a call to your new function in the `read_all_sensors` main loop.
+   a single value to be published via MQTT. The JSON payload is produced by
+   filling the value into the pre-built template from `config['_templates']`,
+   and the MQTT topic is pre-built in `config['_topic']`.
+   e.g., [{'topic': b'Sensor/DHT11', 'payload': b'{"id": ..., "value": 21}'}]
+4. Register your new function for its sensor type in the `_DISPATCH` table.
+   Sensors that need time to measure can also register a start function in
+   `_START`, so their measurement runs while the other sensors are read.
 """
 
+import struct
 import time
 
+import micropython
+import ubinascii
+import ujson
 from machine import Pin, ADC, I2C
 
-# Import sensor-specific libraries with error handling
-try:
-    import dht
-except ImportError:
-    print("Warning: 'dht' library not found. DHT11 sensor will not work.")
-    print("Install it using: import mip; mip.install('dht')")
-    dht = None
-
-try:
-    import onewire
-    import ds18x20
-except ImportError:
-    print(
-        "Warning: 'onewire' or 'ds18x20' library not found. DS18B20 sensor will not work."
-    )
-    print("Install it using: import mip; mip.install('ds18x20')")
-    onewire = None
-    ds18x20 = None
+from config import SENSORS
+
+# Set to True to print progress messages for every sensor read
+DEBUG = False
+
+# Sensor-specific libraries are imported on the first read of a sensor that
+# needs them. None means "not imported yet", False means "not installed".
+dht = None
+onewire = None
+ds18x20 = None
 
 
 # A simple MPU6050 library can be created or downloaded.
 # For this example, we'll create a minimal one right here.
 class MPU6050:
+    # Names of the values returned by get_values(), in order
+    VALUE_KEYS = (
+        "accel_x",
+        "accel_y",
+        "accel_z",
+        "temp",
+        "gyro_x",
+        "gyro_y",
+        "gyro_z",
+    )
+
     def __init__(self, i2c, addr=0x68):
         self.i2c = i2c
         self.addr = addr
+        # Buffer for the 14 data registers ACCEL_XOUT_H (0x3B) to GYRO_ZOUT_L (0x48)
+        self._buf = bytearray(14)
         self.i2c.writeto(self.addr, b"\x6b\x00")  # Wake up the sensor
 
-    def _read_word_2c(self, reg):
-        val = self.i2c.readfrom_mem(self.addr, reg, 2)
-        return val[0] << 8 | val[1]
-
+    @micropython.native
     def get_values(self):
-        raw_values = {
-            "accel_x": self._read_word_2c(0x3B),
-            "accel_y": self._read_word_2c(0x3D),
-            "accel_z": self._read_word_2c(0x3F),
-            "temp": self._read_word_2c(0x41),
-            "gyro_x": self._read_word_2c(0x43),
-            "gyro_y": self._read_word_2c(0x45),
-            "gyro_z": self._read_word_2c(0x47),
-        }
-
-        # Convert to sensible values
-        accel_x = self._convert_to_g(raw_values["accel_x"])
-        accel_y = self._convert_to_g(raw_values["accel_y"])
-        accel_z = self._convert_to_g(raw_values["accel_z"])
-        temp = raw_values["temp"] / 340.0 + 36.53
-        gyro_x = self._convert_to_dps(raw_values["gyro_x"])
-        gyro_y = self._convert_to_dps(raw_values["gyro_y"])
-        gyro_z = self._convert_to_dps(raw_values["gyro_z"])
-
-        return {
-            "accel_x": accel_x,
-            "accel_y": accel_y,
-            "accel_z": accel_z,
-            "temp": temp,
-            "gyro_x": gyro_x,
-            "gyro_y": gyro_y,
-            "gyro_z": gyro_z,
-        }
-
-    def _convert_to_g(self, raw):
-        # Convert raw accelerometer data to 'g'
-        return self._twos_complement(raw) / 16384.0
-
-    def _convert_to_dps(self, raw):
-        # Convert raw gyroscope data to degrees per second
-        return self._twos_complement(raw) / 131.0
-
-    @staticmethod
-    def _twos_complement(val):
-        if val >= 0x8000:
-            return -((65535 - val) + 1)
+        # The register pointer auto-increments, so all values can be read in
+        # a single I2C transaction. Each is a big-endian signed 16-bit integer.
+        self.i2c.readfrom_mem_into(self.addr, 0x3B, self._buf)
+        ax, ay, az, t, gx, gy, gz = struct.unpack(">hhhhhhh", self._buf)
+
+        # Convert to hundredths of 'g', degrees Celsius and degrees per second,
+        # rounded half up with integer math: (2 * n + d) // (2 * d). Unlike
+        # round(), exact ties (e.g. 0.125 g) round up instead of to even.
+        return (
+            (ax * 200 + 16384) // 32768,  # ax / 16384
+            (ay * 200 + 16384) // 32768,
+            (az * 200 + 16384) // 32768,
+            (t * 10 + 17) // 34 + 3653,  # t / 340 + 36.53
+            (gx * 200 + 131) // 262,  # gx / 131
+            (gy * 200 + 131) // 262,
+            (gz * 200 + 131) // 262,
+        )
+
+
+# --- Payload Templates ---
+
+# Readings are published to '<prefix><sensor type>', e.g. b'Sensor/DHT11'
+_TOPIC_PREFIX = b"Sensor/"
+
+
+def _json_literal(value):
+    """
+    Encodes a static value as JSON, escaped for use inside a %-format template.
+    """
+    return ujson.dumps(value).replace("%", "%%")
+
+
+def _build_templates(config, value_format="%s"):
+    """
+    Pre-builds the JSON payload for every value a sensor provides.
+
+    Only the measured value changes between readings, so each template is a
+    UTF-8 encoded %-format bytes object with a `value_format` placeholder
+    (by default a single '%s') for it. Values are passed to it as numbers or
+    str; MicroPython would format a bytes argument as its repr (b'...').
+    DS18B20 buses use an 'id_prefix' instead of a fixed 'id'; their templates
+    take the sensor's ROM suffix as a first placeholder.
+
+    The templates are stored in config['_templates'], keyed like 'provides'.
+    """
+    location = _json_literal(config["location"])
+    active = _json_literal(config["active"])
+    templates = {}
+    for key, value_config in config["provides"].items():
+        if "id_prefix" in value_config:
+            # Drop the closing quote and append the ROM suffix placeholder
+            value_id = _json_literal(value_config["id_prefix"])[:-1] + '_%s"'
         else:
-            return val
+            value_id = _json_literal(value_config["id"])
+        templates[key] = (
+            '{"id":%s,"value":%s,"unit":%s,"location":%s,"active":%s}'
+            % (
+                value_id,
+                value_format,
+                _json_literal(value_config["unit"]),
+                location,
+                active,
+            )
+        ).encode()
+    config["_templates"] = templates
 
 
 # --- Sensor Reading Functions ---
 
+# Hardware objects (Pin, ADC, I2C, drivers), keyed by sensor name.
+# Each entry is created on the first read of that sensor and reused afterwards,
+# so the peripherals are only allocated and configured once.
+_HW_CACHE = {}
+
+# Maximum temperature conversion time of a DS18B20 at 12-bit resolution
+_DS18B20_CONVERSION_MS = 750
 
-def _read_dht11(config):
+
+def _read_dht11(sensor_name, config):
+    global dht
+    if dht is None:
+        try:
+            import dht
+        except ImportError:
+            print("Warning: 'dht' library not found. DHT11 sensor will not work.")
+            print("Install it using: import mip; mip.install('dht')")
+            dht = False
     if not dht:
         return []
     try:
-        sensor = dht.DHT11(Pin(config["pin"]))
+        sensor = _HW_CACHE.get(sensor_name)
+        if sensor is None:
+            sensor = dht.DHT11(Pin(config["pin"]))
+            _HW_CACHE[sensor_name] = sensor
         sensor.measure()
         temp = sensor.temperature()
         hum = sensor.humidity()
 
+        topic = config["_topic"]
+        templates = config["_templates"]
         readings = [
-            {
-                "type": config["type"],
-                "data": {
-                    "id": config["provides"]["temperature"]["id"],
-                    "value": temp,
-                    "unit": config["provides"]["temperature"]["unit"],
-                    "location": config["location"],
-                    "active": config["active"],
-                },
-            },
-            {
-                "type": config["type"],
-                "data": {
-                    "id": config["provides"]["humidity"]["id"],
-                    "value": hum,
-                    "unit": config["provides"]["humidity"]["unit"],
-                    "location": config["location"],
-                    "active": config["active"],
-                },
-            },
+            # Temperature reading
+            {"topic": topic, "payload": templates["temperature"] % temp},
+            # Humidity reading
+            {"topic": topic, "payload": templates["humidity"] % hum},
         ]
-        # Temperature reading
-        # Humidity reading
         return readings
     except Exception as e:
         print(f"Error reading DHT11 sensor: {e}")
         return []
 
 
-def _read_ds18b20_bus(config):
+def _start_ds18b20_bus(sensor_name, config):
+    """
+    Starts a temperature conversion on all DS18B20 sensors of the bus.
+
+    The conversion runs on the sensors themselves, so other sensors can be
+    read while waiting for it. Call `_read_ds18b20_bus` once it has finished.
+
+    Returns:
+        The conversion time in milliseconds, or None if it could not be started.
+    """
+    global onewire, ds18x20
+    if onewire is None:
+        try:
+            import onewire
+            import ds18x20
+        except ImportError:
+            print(
+                "Warning: 'onewire' or 'ds18x20' library not found. DS18B20 sensor will not work."
+            )
+            print("Install it using: import mip; mip.install('ds18x20')")
+            onewire = False
+            ds18x20 = False
     if not onewire or not ds18x20:
-        return []
+        return None
+    try:
+        hw = _HW_CACHE.get(sensor_name)
+        if hw is None:
+            ow = onewire.OneWire(Pin(config["pin"]))
+            time.sleep_ms(100)  # Let the bus settle after initialization
+            ds = ds18x20.DS18X20(ow)
+            # The sensors on the bus rarely change, so the bus is only scanned
+            # again after a read error (see _read_ds18b20_bus)
+            roms = ds.scan()
+            if not roms:
+                print("Warning: No DS18B20 sensors found on the bus.")
+                return None
+            hw = (ow, ds, roms)
+            _HW_CACHE[sensor_name] = hw
+        hw[1].convert_temp()
+        return _DS18B20_CONVERSION_MS
+    except Exception as e:
+        print(f"Error starting DS18B20 conversion: {e}")
+        _HW_CACHE.pop(sensor_name, None)  # Re-initialize the bus next time
+        return None
+
+
+def _read_ds18b20_bus(sensor_name, config):
+    """
+    Reads the temperatures of a conversion started by `_start_ds18b20_bus`.
+    """
     try:
-        ow = onewire.OneWire(Pin(config["pin"]))
-        time.sleep_ms(100)  # Speculative delay for bus to settle
-        ds = ds18x20.DS18X20(ow)
-        roms = ds.scan()
-        ds.convert_temp()
-        time.sleep_ms(750)
+        _, ds, roms = _HW_CACHE[sensor_name]
+        topic = config["_topic"]
+        template = config["_templates"]["temperature"]
 
         readings = []
         for rom in roms:
             temp = ds.read_temp(rom)
-            rom_id = "".join("{:02x}".format(x) for x in rom)
-            sensor_id = (
-                f"{config['provides']['temperature']['id_prefix']}_{rom_id[-4:]}"
-            )
+            rom_id = ubinascii.hexlify(rom).decode()
 
             readings.append(
-                {
-                    "type": config["type"],
-                    "data": {
-                        "id": sensor_id,
-                        "value": temp,
-                        "unit": config["provides"]["temperature"]["unit"],
-                        "location": config["location"],
-                        "active": config["active"],
-                    },
-                }
+                {"topic": topic, "payload": template % (rom_id[-4:], temp)}
             )
         return readings
     except Exception as e:
         print(f"Error reading DS18B20 bus: {e}")
+        _HW_CACHE.pop(sensor_name, None)  # Rescan the bus next time
         return []
 
 
-def _read_button(config):
+def _read_button(sensor_name, config):
     try:
-        button = Pin(config["pin"], Pin.IN, Pin.PULL_UP)
+        button = _HW_CACHE.get(sensor_name)
+        if button is None:
+            button = Pin(config["pin"], Pin.IN, Pin.PULL_UP)
+            _HW_CACHE[sensor_name] = button
         # Value is 0 if pressed, 1 if not pressed (due to PULL_UP)
-        # We invert it to get a more intuitive boolean (True if pressed)
-        value = not button.value()
+        # We invert it to get a more intuitive boolean (true if pressed)
+        value = "false" if button.value() else "true"
         return [
             {
-                "type": config["type"],
-                "data": {
-                    "id": config["provides"]["state"]["id"],
-                    "value": value,
-                    "unit": config["provides"]["state"]["unit"],
-                    "location": config["location"],
-                    "active": config["active"],
-                },
+                "topic": config["_topic"],
+                "payload": config["_templates"]["state"] % value,
             }
         ]
     except Exception as e:
@@ -198,21 +265,18 @@ def _read_button(config):
         return []
 
 
-def _read_ldr(config):
+def _read_ldr(sensor_name, config):
     try:
-        adc = ADC(Pin(config["pin"]))
-        adc.init(sample_ns=50, atten=ADC.ATTN_11DB)
+        adc = _HW_CACHE.get(sensor_name)
+        if adc is None:
+            adc = ADC(Pin(config["pin"]))
+            adc.init(sample_ns=50, atten=ADC.ATTN_11DB)
+            _HW_CACHE[sensor_name] = adc
         value = adc.read_uv()
         return [
             {
-                "type": config["type"],
-                "data": {
-                    "id": config["provides"]["light"]["id"],
-                    "value": value,
-                    "unit": config["provides"]["light"]["unit"],
-                    "location": config["location"],
-                    "active": config["active"],
-                },
+                "topic": config["_topic"],
+                "payload": config["_templates"]["light"] % value,
             }
         ]
     except Exception as e:
@@ -220,25 +284,30 @@ def _read_ldr(config):
         return []
 
 
-def _read_gy521(config):
+def _read_gy521(sensor_name, config):
     try:
-        i2c = I2C(0, scl=Pin(config["scl_pin"]), sda=Pin(config["sda_pin"]))
-        mpu = MPU6050(i2c)
+        hw = _HW_CACHE.get(sensor_name)
+        if hw is None:
+            i2c = I2C(0, scl=Pin(config["scl_pin"]), sda=Pin(config["sda_pin"]))
+            hw = (i2c, MPU6050(i2c))
+            _HW_CACHE[sensor_name] = hw
+        mpu = hw[1]
         values = mpu.get_values()
+        topic = config["_topic"]
+        templates = config["_templates"]
 
         readings = []
-        for key, value in values.items():
-            sensor_config = config["provides"][key]
+        for key, value in zip(MPU6050.VALUE_KEYS, values):
+            # Values are in hundredths; format them as fixed-point decimals
+            if value < 0:
+                sign = "-"
+                value = -value
+            else:
+                sign = ""
             readings.append(
                 {
-                    "type": config["type"],
-                    "data": {
-                        "id": sensor_config["id"],
-                        "value": round(value, 2),
-                        "unit": sensor_config["unit"],
-                        "location": config["location"],
-                        "active": config["active"],
-                    },
+                    "topic": topic,
+                    "payload": templates[key] % (sign, value // 100, value % 100),
                 }
             )
         return readings
@@ -247,45 +316,163 @@ def _read_gy521(config):
         return []
 
 
-# --- Main Function ---
+# --- Sensor Dispatch ---
+
+# Maps each sensor 'type' from config.py to its reader function.
+# To support a new sensor type, add its reader here.
+_DISPATCH = {
+    "DHT11": _read_dht11,
+    "DS18B20": _read_ds18b20_bus,
+    "Button": _read_button,
+    "LDR": _read_ldr,
+    "GY521": _read_gy521,
+    # 'SoilMoisture': _read_soil_moisture,
+}
+
+# Sensor types that need time to take a measurement. Their start function
+# kicks off the measurement and returns how long it takes (in ms); the reader
+# from _DISPATCH is called once that time has passed.
+_START = {
+    "DS18B20": _start_ds18b20_bus,
+}
+
+# Payload value placeholders for sensor types that don't pass a single value.
+# GY521 values are given as (sign, whole units, hundredths).
+_VALUE_FORMATS = {
+    "GY521": "%s%d.%02d",
+}
+
+# Values each sensor type must declare in its 'provides' dictionary
+_REQUIRED_VALUES = {
+    "DHT11": ("temperature", "humidity"),
+    "DS18B20": ("temperature",),
+    "Button": ("state",),
+    "LDR": ("light",),
+    "GY521": MPU6050.VALUE_KEYS,
+}
+
+
+# Key holding the MQTT id of each provided value. DS18B20 buses can have any
+# number of sensors, so they use a prefix that is completed with the ROM id.
+_ID_KEYS = {
+    "DS18B20": "id_prefix",
+}
+
+
+def _validate_config(sensor_name, config):
+    """
+    Checks that a sensor's 'provides' dictionary has everything the reader
+    and the payload templates need, so mistakes in config.py fail at import
+    time instead of during a read cycle.
 
+    Raises:
+        ValueError: If 'location', a required value or one of its keys is
+                    missing, or a value uses the wrong id key for its type.
+    """
+    if "location" not in config:
+        raise ValueError(f"Sensor '{sensor_name}' is missing 'location'")
+    provides = config.get("provides", {})
+    for key in _REQUIRED_VALUES.get(config["type"], ()):
+        if key not in provides:
+            raise ValueError(f"Sensor '{sensor_name}' is missing provides['{key}']")
+    id_key = _ID_KEYS.get(config["type"], "id")
+    other_key = "id" if id_key == "id_prefix" else "id_prefix"
+    for key, value_config in provides.items():
+        if "unit" not in value_config or id_key not in value_config:
+            raise ValueError(
+                f"Sensor '{sensor_name}' provides['{key}'] needs 'unit' and '{id_key}'"
+            )
+        if other_key in value_config:
+            raise ValueError(
+                f"Sensor '{sensor_name}' provides['{key}'] must use '{id_key}', not '{other_key}'"
+            )
 
-def read_all_sensors():
+
+def _build_active_sensors():
     """
-    Main function to read all sensors defined in config.py.
+    Validates every active sensor and resolves its reader function, MQTT topic
+    and payload templates once at import time.
 
     Returns:
-        A list of all sensor readings. Each reading is a dictionary
-        formatted for publishing.
+        A tuple of two tuples: (sensor_name, reader_function, config) triples
+        for sensors read directly, and (sensor_name, start_function,
+        reader_function, config) quadruples for sensors listed in _START.
     """
-    from config import SENSORS
-
-    all_readings = []
-
-    print("\n--- Reading all sensors ---")
+    direct = []
+    deferred = []
     for sensor_name, config in SENSORS.items():
         if not config.get("active", False):
             continue
-
-        print(f"Reading sensor: {sensor_name} ({config['type']})")
-
-        if config["type"] == "DHT11":
-            all_readings.extend(_read_dht11(config))
-        elif config["type"] == "DS18B20":
-            all_readings.extend(_read_ds18b20_bus(config))
-        elif config["type"] == "Button":
-            all_readings.extend(_read_button(config))
-        elif config["type"] == "LDR":
-            all_readings.extend(_read_ldr(config))
-        elif config["type"] == "GY521":
-            all_readings.extend(_read_gy521(config))
-        # Add more 'elif' blocks here for other sensor types
-        # elif config['type'] == 'SoilMoisture':
-        #     all_readings.extend(_read_soil_moisture(config))
-        else:
+        reader = _DISPATCH.get(config["type"])
+        if reader is None:
             print(
                 f"Warning: No reader function implemented for sensor type '{config['type']}'"
             )
+            continue
+        _validate_config(sensor_name, config)
+        config["_topic"] = _TOPIC_PREFIX + config["type"].encode()
+        _build_templates(config, _VALUE_FORMATS.get(config["type"], "%s"))
+        start = _START.get(config["type"])
+        if start is None:
+            direct.append((sensor_name, reader, config))
+        else:
+            deferred.append((sensor_name, start, reader, config))
+    return tuple(direct), tuple(deferred)
+
+
+_ACTIVE_SENSORS, _DEFERRED_SENSORS = _build_active_sensors()
+
+
+# --- Main Function ---
+
+
+@micropython.native
+def read_all_sensors():
+    """
+    Main function to read all active sensors defined in config.py.
 
-    print("--- Finished reading sensors ---")
+    Measurements of sensors in _DEFERRED_SENSORS are started first, the other
+    sensors are read while they are in progress, and the deferred sensors are
+    read last.
+
+    Compiled with the native code emitter; error handling is left to the
+    individual reader functions.
+
+    Returns:
+        A list of all sensor readings. Each reading is a dictionary
+        formatted for publishing.
+    """
+    all_readings = []
+
+    if DEBUG:
+        print("\n--- Reading all sensors ---")
+    pending = []
+    deadline = None
+    for sensor_name, start, reader, config in _DEFERRED_SENSORS:
+        if DEBUG:
+            print(f"Starting sensor: {sensor_name} ({config['type']})")
+        delay_ms = start(sensor_name, config)
+        if delay_ms is None:
+            continue
+        ready = time.ticks_add(time.ticks_ms(), delay_ms)
+        if deadline is None or time.ticks_diff(ready, deadline) > 0:
+            deadline = ready
+        pending.append((sensor_name, reader, config))
+
+    for sensor_name, reader, config in _ACTIVE_SENSORS:
+        if DEBUG:
+            print(f"Reading sensor: {sensor_name} ({config['type']})")
+        all_readings.extend(reader(sensor_name, config))
+
+    if pending:
+        remaining = time.ticks_diff(deadline, time.ticks_ms())
+        if remaining > 0:
+            time.sleep_ms(remaining)
+        for sensor_name, reader, config in pending:
+            if DEBUG:
+                print(f"Reading sensor: {sensor_name} ({config['type']})")
+            all_readings.extend(reader(sensor_name, config))
+
+    if DEBUG:
+        print("--- Finished reading sensors ---")
     return all_readings
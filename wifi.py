@@ -20,17 +20,22 @@ except (ImportError, KeyError):
     STATUS_LED_PIN = None
 
 
-def connect_wifi():
+def connect_wifi(led=None):
     """
     Connects the device to the Wi-Fi network using credentials from secrets.py.
     It tries each network in the 'wifi_credentials' list until a connection is established.
     Blinks the status LED while connecting.
+
+    Args:
+        led (Pin, optional): An already initialized status LED pin. If not
+                             given, one is created from STATUS_LED_PIN.
     """
     if not all([WIFI_CREDENTIALS, STATUS_LED_PIN is not None]):
         print("Wi-Fi credentials or STATUS_LED_PIN are not configured. Halting.")
         return False
 
-    led = Pin(STATUS_LED_PIN, Pin.OUT)
+    if led is None:
+        led = Pin(STATUS_LED_PIN, Pin.OUT)
     wlan = network.WLAN(network.STA_IF)
     wlan.active(True)
 
@@ -57,9 +62,9 @@ def connect_wifi():
                 break
             max_wait -= 1
             led.on()
-            time.sleep(0.1)
+            time.sleep_ms(100)
             led.off()
-            time.sleep(0.4)
+            time.sleep_ms(400)
 
         if wlan.isconnected():
             print("Wi-Fi connected.")
@@ -75,7 +80,7 @@ def connect_wifi():
     # Fast blink to indicate error
     for _ in range(10):
         led.on()
-        time.sleep(0.1)
+        time.sleep_ms(100)
         led.off()
-        time.sleep(0.1)
+        time.sleep_ms(100)
     return False